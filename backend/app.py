@@ -7,6 +7,7 @@ from routes.chatgpt_routes import setChatgptRoutes
 from routes.recipe_routes import setRecipeRoutes
 from routes.video_room_routes import setVideoRoomRoutes
 from routes.image_routes import setImageGenRoutes
+from routes.upload_routes import setUploadRoutes
 
 # Load environment variables from .env file
 load_dotenv()
@@ -23,6 +24,7 @@ setVisionRoutes(app)         # Google Vision API for ingredient detection
 setChatgptRoutes(app)        # OpenAI ChatGPT for recipe generation
 setVideoRoomRoutes(app)      # Daily.co video room management
 setImageGenRoutes(app)       # Unsplash image search for recipes
+setUploadRoutes(app)         # Upload size limits, temp-file spooling and memory stats
 
 if __name__ == '__main__':
     # Run Flask development server
@@ -38,7 +38,7 @@ class VisionController:
         ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg'}
         return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-    def analyze_image(self, image_file):
+    def analyze_image(self, image_file, memory=None):
         """
         Analyze an uploaded image to identify food ingredients using Google Cloud Vision API.
         
@@ -47,6 +47,7 @@ class VisionController:
         
         Args:
             image_file: Uploaded image file object with read() method and filename attribute
+            memory (UploadMemoryTracker, optional): Tracker to charge the image bytes to
             
         Returns:
             list: List of identified ingredients/food items as strings
@@ -59,6 +60,8 @@ class VisionController:
             if image_file and self.allowed_file(image_file.filename):
                 # Read image content for Vision API processing
                 content = image_file.read()
+                if memory is not None:
+                    memory.allocate(len(content))
                 image = vision.Image(content=content)
 
                 # Perform object localization to detect specific food objects
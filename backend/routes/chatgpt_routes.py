@@ -1,11 +1,21 @@
 import os
 import openai
 import requests
-import io
+import tempfile
 from PIL import Image
 from flask import Blueprint, request, jsonify
 from dotenv import load_dotenv
 from routes.VisionController import VisionController
+from routes.upload_routes import (
+    UPLOAD_SPOOL_THRESHOLD,
+    UploadMemoryTracker,
+    UploadRejected,
+    in_memory_size,
+    inspect_image_upload,
+    raster_size,
+    upload_memory_stats,
+)
+from werkzeug.exceptions import RequestEntityTooLarge
 
 # Load environment variables from .env file
 load_dotenv()
@@ -19,53 +29,57 @@ chatgpt_bp = Blueprint('chatgpt_routes', __name__)
 # Initialize Google Vision API controller for ingredient detection
 vision_controller = VisionController()
 
-def compress_image(image_file, quality=80, max_size=(800, 800)):
+def compress_image(image_file, quality=80, max_size=(800, 800), memory=None):
     """
     Compress uploaded images to optimize processing and reduce API costs.
     
     Reduces image file size while maintaining quality suitable for ingredient detection.
     This helps with Google Vision API processing speed and reduces bandwidth usage.
+    JPEGs are decoded at a reduced scale where possible, and the compressed output is
+    spooled to a temp file once it grows past UPLOAD_SPOOL_THRESHOLD.
     
     Args:
         image_file: Uploaded image file object
         quality (int): JPEG compression quality (1-100, default 80)
         max_size (tuple): Maximum dimensions (width, height) for resizing
+        memory (UploadMemoryTracker, optional): Tracker to charge decoded and encoded buffers to
         
     Returns:
-        BytesIOWithFilename: Compressed image data with filename attribute
+        SpooledTemporaryFile: Compressed image data with filename attribute
     """
-    img = Image.open(image_file)
-    
-    # Resize if the image is too large
-    if img.width > max_size[0] or img.height > max_size[1]:
-        img.thumbnail(max_size, Image.LANCZOS)
-    
-    # Save compressed image to BytesIO
-    output = io.BytesIO()
-    
-    # Determine format based on original image
-    format = img.format if img.format else 'JPEG'
-    
-    # Convert RGBA to RGB for JPEG format
-    if format == 'JPEG' and img.mode == 'RGBA':
-        img = img.convert('RGB')
-        
-    # Save with compression
-    img.save(output, format=format, quality=quality, optimize=True)
+    if memory is None:
+        memory = UploadMemoryTracker()
+
+    with Image.open(image_file) as img:
+        # Determine format based on original image
+        format = img.format if img.format else 'JPEG'
+
+        # Let the JPEG decoder downscale while decoding instead of materialising full resolution
+        img.draft(None, max_size)
+        img.load()
+        decoded_bytes = raster_size(img)
+        memory.allocate(decoded_bytes)
+
+        # Resize if the image is too large
+        if img.width > max_size[0] or img.height > max_size[1]:
+            img.thumbnail(max_size, Image.LANCZOS)
+            memory.allocate(raster_size(img))
+            memory.release(decoded_bytes)
+            decoded_bytes = raster_size(img)
+
+        # Convert RGBA to RGB for JPEG format
+        if format == 'JPEG' and img.mode == 'RGBA':
+            img = img.convert('RGB')
+
+        # Save with compression straight into a spooled file, keeping the original filename
+        output = tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_THRESHOLD, mode="w+b")
+        output.filename = getattr(image_file, 'filename', 'image.jpg')
+        img.save(output, format=format, quality=quality, optimize=True)
+        memory.allocate(in_memory_size(output))
+        memory.release(decoded_bytes)
+
     output.seek(0)
-    
-    # Create a class that wraps BytesIO with a filename attribute
-    class BytesIOWithFilename(io.BytesIO):
-        def __init__(self, *args, **kwargs):
-            self.filename = kwargs.pop('filename', 'image.jpg')
-            super().__init__(*args, **kwargs)
-    
-    # Copy the data into a new BytesIO with filename
-    result = BytesIOWithFilename(filename=getattr(image_file, 'filename', 'image.jpg'))
-    result.write(output.getvalue())
-    result.seek(0)
-    
-    return result
+    return output
 
 @chatgpt_bp.route('/api/chatgpt/get-recipes', methods=['POST'])
 def get_recipes():
@@ -90,11 +104,16 @@ def get_recipes():
             
         image_file = request.files['image']
         
-        # Compress the image to optimize processing speed and reduce API costs
-        compressed_image = compress_image(image_file)
+        # Reject unsupported or oversized images from their header, before decoding
+        inspect_image_upload(image_file)
+        memory = UploadMemoryTracker()
+        memory.allocate(in_memory_size(image_file.stream))
         
-        # Use Google Vision API to identify ingredients in the uploaded image
-        ingredients = vision_controller.analyze_image(compressed_image)
+        # Compress the image to optimize processing speed and reduce API costs
+        with compress_image(image_file, memory=memory) as compressed_image:
+            # Use Google Vision API to identify ingredients in the uploaded image
+            ingredients = vision_controller.analyze_image(compressed_image, memory=memory)
+        upload_memory_stats.record(memory)
         if not ingredients:
             return jsonify({"error": "No ingredients found in image"}), 400
 
@@ -145,6 +164,11 @@ Each recipe should be appropriate for {meal_type}. Do NOT use the ingredients th
         # Frontend will handle JSON parsing and recipe display
         return jsonify({"recipes": [content]})
         
+    except UploadRejected as e:
+        return jsonify({"error": e.message}), e.status_code
+    except RequestEntityTooLarge:
+        # Let the app-level 413 handler respond instead of reporting a server error
+        raise
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     
@@ -0,0 +1,242 @@
+import os
+import sys
+import tempfile
+import threading
+from PIL import Image
+from flask import Blueprint, Request, jsonify
+from dotenv import load_dotenv
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Upload limits, overridable through environment variables
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", 16 * 1024 * 1024))       # Whole request body
+UPLOAD_SPOOL_THRESHOLD = int(os.getenv("UPLOAD_SPOOL_THRESHOLD", 512 * 1024))  # Larger files go to disk
+MAX_IMAGE_DIMENSION = int(os.getenv("MAX_IMAGE_DIMENSION", 8000))             # Longest side in pixels
+MAX_IMAGE_PIXELS = int(os.getenv("MAX_IMAGE_PIXELS", 40_000_000))             # Width * height
+
+# Formats we can decode; must stay in sync with VisionController.allowed_file
+SUPPORTED_IMAGE_FORMATS = {'PNG', 'JPEG'}
+
+# ISO-BMFF brands used by HEIC/HEIF files (bytes 8-12 of the 'ftyp' box)
+HEIF_BRANDS = {b'heic', b'heix', b'hevc', b'hevx', b'heim', b'heis', b'mif1', b'msf1'}
+
+# Initialize Flask Blueprint for upload diagnostics routes
+upload_routes = Blueprint('upload_routes', __name__)
+
+
+class UploadRejected(Exception):
+    """
+    Raised when an uploaded image fails validation before it is decoded.
+
+    Attributes:
+        message (str): Human-readable reason returned to the client
+        status_code (int): HTTP status code to respond with
+    """
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+class SpooledUploadRequest(Request):
+    """
+    Flask request class that buffers uploaded files in memory only up to
+    UPLOAD_SPOOL_THRESHOLD bytes and spills anything larger to a temp file.
+    """
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_THRESHOLD, mode="rb+")
+
+
+class UploadMemoryTracker:
+    """
+    Per-upload accounting of the buffers held in memory while an image is processed.
+
+    Callers report each buffer with allocate() and release() it once it is dropped;
+    `peak` is the largest amount held at any one time. Pillow allocates pixel data
+    outside the Python heap, so this is an estimate based on buffer sizes rather
+    than a measurement of the process.
+    """
+
+    def __init__(self):
+        self.current = 0
+        self.peak = 0
+
+    def allocate(self, nbytes):
+        self.current += nbytes
+        self.peak = max(self.peak, self.current)
+
+    def release(self, nbytes):
+        self.current = max(self.current - nbytes, 0)
+
+
+class UploadMemoryStats:
+    """
+    Thread-safe aggregate of per-upload peak memory, exposed via /api/uploads/memory-stats.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.uploads = 0
+        self.last_peak_bytes = 0
+        self.max_peak_bytes = 0
+        self.total_peak_bytes = 0
+
+    def record(self, tracker):
+        with self._lock:
+            self.uploads += 1
+            self.last_peak_bytes = tracker.peak
+            self.max_peak_bytes = max(self.max_peak_bytes, tracker.peak)
+            self.total_peak_bytes += tracker.peak
+
+    def snapshot(self):
+        with self._lock:
+            average = self.total_peak_bytes // self.uploads if self.uploads else 0
+            return {
+                "uploads": self.uploads,
+                "last_peak_bytes": self.last_peak_bytes,
+                "max_peak_bytes": self.max_peak_bytes,
+                "average_peak_bytes": average,
+                "process_max_rss_bytes": process_max_rss_bytes(),
+                "limits": {
+                    "max_upload_bytes": MAX_UPLOAD_BYTES,
+                    "spool_threshold_bytes": UPLOAD_SPOOL_THRESHOLD,
+                    "max_image_dimension": MAX_IMAGE_DIMENSION,
+                    "max_image_pixels": MAX_IMAGE_PIXELS,
+                },
+            }
+
+
+# Shared across all image endpoints
+upload_memory_stats = UploadMemoryStats()
+
+
+def process_max_rss_bytes():
+    """
+    Return the peak resident set size of this worker process, or None if unavailable.
+    """
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kilobytes on Linux
+    return max_rss if sys.platform == 'darwin' else max_rss * 1024
+
+
+def in_memory_size(stream):
+    """
+    Return how many bytes of a file-like object are held in memory.
+
+    Spooled files that have rolled over to disk (and regular temp files) count as zero.
+    """
+    if isinstance(stream, tempfile.SpooledTemporaryFile):
+        if stream._rolled:
+            return 0
+        return stream._file.getbuffer().nbytes
+    if hasattr(stream, 'getbuffer'):
+        return stream.getbuffer().nbytes
+    return 0
+
+
+def raster_size(img):
+    """
+    Return the number of bytes needed to hold the decoded pixels of a PIL image.
+    """
+    return img.width * img.height * len(img.getbands())
+
+
+def sniff_image_format(header):
+    """
+    Identify an image format from its leading magic bytes.
+
+    Args:
+        header (bytes): First bytes of the file (at least 12)
+
+    Returns:
+        str: 'PNG', 'JPEG', 'HEIC', or None if the format is not recognised
+    """
+    if header.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'PNG'
+    if header.startswith(b'\xff\xd8\xff'):
+        return 'JPEG'
+    if header[4:8] == b'ftyp' and header[8:12] in HEIF_BRANDS:
+        return 'HEIC'
+    return None
+
+
+def inspect_image_upload(image_file):
+    """
+    Validate an uploaded image using only its header, before any pixel data is decoded.
+
+    Checks the magic bytes against SUPPORTED_IMAGE_FORMATS and the dimensions declared
+    in the header against MAX_IMAGE_DIMENSION and MAX_IMAGE_PIXELS. The stream is
+    rewound so it can be read again by the caller.
+
+    Args:
+        image_file: Uploaded file object with a seekable stream
+
+    Returns:
+        tuple: (format, width, height) of the image
+
+    Raises:
+        UploadRejected: If the file is not a supported image or is too large
+    """
+    header = image_file.read(12)
+    image_file.seek(0)
+
+    image_format = sniff_image_format(header)
+    if image_format is None:
+        raise UploadRejected("Unrecognised image format", 415)
+    if image_format not in SUPPORTED_IMAGE_FORMATS:
+        raise UploadRejected(f"{image_format} images are not supported, please upload PNG or JPEG", 415)
+
+    # Image.open is lazy: it parses the header but does not decode pixels
+    try:
+        with Image.open(image_file) as img:
+            width, height = img.size
+    except Exception:
+        raise UploadRejected("Image file is corrupt or truncated", 400)
+    finally:
+        image_file.seek(0)
+
+    if max(width, height) > MAX_IMAGE_DIMENSION or width * height > MAX_IMAGE_PIXELS:
+        raise UploadRejected(f"Image dimensions {width}x{height} exceed the allowed maximum", 413)
+
+    return image_format, width, height
+
+
+@upload_routes.route('/api/uploads/memory-stats', methods=['GET'])
+def memory_stats():
+    """
+    Report peak memory used per image upload along with the configured upload limits.
+
+    Returns:
+        JSON response with upload count, last/max/average peak bytes and process RSS
+    """
+    return jsonify(upload_memory_stats.snapshot()), 200
+
+
+def setUploadRoutes(app):
+    """
+    Apply upload size limits to the Flask application and register upload routes.
+
+    Sets MAX_CONTENT_LENGTH so oversized requests are rejected with 413 while the body
+    is being read, and installs SpooledUploadRequest so large files are kept on disk.
+
+    Args:
+        app: Flask application instance
+    """
+    app.config['MAX_CONTENT_LENGTH'] = MAX_UPLOAD_BYTES
+    app.request_class = SpooledUploadRequest
+
+    @app.errorhandler(413)
+    def request_too_large(error):
+        return jsonify({"error": f"Upload exceeds the {MAX_UPLOAD_BYTES} byte limit"}), 413
+
+    app.register_blueprint(upload_routes)
@@ -1,5 +1,12 @@
 from flask import Blueprint, request, jsonify
 from routes.VisionController import VisionController
+from routes.upload_routes import (
+    UploadMemoryTracker,
+    UploadRejected,
+    in_memory_size,
+    inspect_image_upload,
+    upload_memory_stats,
+)
 
 # Initialize Flask Blueprint for Google Vision API routes
 vision_routes = Blueprint('vision_routes', __name__)
@@ -16,7 +23,7 @@ def analyze_image():
     Useful for testing ingredient detection or building custom workflows.
     
     Expected:
-        - POST request with image file in 'file' field
+        - POST request with PNG or JPEG image file in 'file' field
         
     Returns:
         JSON response with list of detected ingredients or error message
@@ -28,8 +35,17 @@ def analyze_image():
     # Extract uploaded image file
     image_file = request.files['file']
     
+    # Reject unsupported or oversized images from their header, before analysis
+    try:
+        inspect_image_upload(image_file)
+    except UploadRejected as e:
+        return jsonify({'error': e.message}), e.status_code
+    memory = UploadMemoryTracker()
+    memory.allocate(in_memory_size(image_file.stream))
+    
     # Use Google Vision API to identify ingredients in the image
-    ingredients = vision_controller.analyze_image(image_file)
+    ingredients = vision_controller.analyze_image(image_file, memory=memory)
+    upload_memory_stats.record(memory)
     
     # Return detected ingredients as JSON array
     return jsonify({'ingredients': ingredients}), 200